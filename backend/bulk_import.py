@@ -0,0 +1,348 @@
+import argparse
+import csv
+import datetime
+import hashlib
+import io
+import itertools
+import json
+import mimetypes
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
+
+from backend.config import AWS_REGION
+
+# Bulk election/candidate import.
+# A manifest is a flat list of candidate rows (CSV or JSON), each naming the
+# election it belongs to:
+#   election_name, election_description, start_date, end_date,
+#   candidate_name, party, age, bio, image_path | image_url
+# IDs are derived from names (uuid5) so re-running an interrupted import
+# overwrites the same items instead of duplicating them, and a checkpoint
+# file records which rows are already written so they are skipped. An
+# election whose name already exists in the table (e.g. created in the admin
+# UI) is reused as-is; its candidates are added to it and the existing
+# election item is left untouched.
+
+BUCKET_NAME = "votesbucketmajorproject"
+ID_NAMESPACE = uuid.UUID("6f1c7c1e-2b8a-4c5e-9a57-3d1e4b0f9c21")
+REQUIRED_FIELDS = ["election_name", "start_date", "end_date", "candidate_name", "party"]
+DEFAULT_WORKERS = 16
+CHECKPOINT_EVERY = 500
+
+
+class ManifestError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid manifest row(s):\n" + "\n".join(errors))
+
+
+def election_id_for(name):
+    return str(uuid.uuid5(ID_NAMESPACE, f"election:{name}"))
+
+
+def candidate_id_for(election_name, candidate_name, party):
+    return str(uuid.uuid5(ID_NAMESPACE, f"candidate:{election_name}:{candidate_name}:{party}"))
+
+
+# --- Manifest loading ---
+def load_manifest(source, fmt=None):
+    """Read manifest rows from a path or a file-like object (e.g. a Streamlit upload)."""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    fmt = fmt or os.path.splitext(name)[-1].lstrip(".").lower()
+
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = source.read()
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+
+    if fmt == "json":
+        data = json.loads(text)
+        rows = data.get("candidates", []) if isinstance(data, dict) else data
+    elif fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        raise ValueError(f"Unsupported manifest format: {fmt!r} (expected csv or json)")
+
+    if not isinstance(rows, list):
+        raise ValueError("JSON manifest must be a list of rows or {\"candidates\": [...]}")
+    return rows
+
+
+def validate_manifest(rows, base_dir="."):
+    """Check every row before anything is written. Returns (elections, candidates)."""
+    errors = []
+    elections = {}
+    candidates = []
+    seen = set()
+
+    for line, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            errors.append(f"row {line}: expected an object with named fields")
+            continue
+        if None in row:
+            # csv.DictReader files surplus values under the key None
+            errors.append(f"row {line}: more values than header columns (unquoted comma?)")
+            continue
+        row = {str(k).strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+
+        missing = [field for field in REQUIRED_FIELDS if not row.get(field)]
+        if missing:
+            errors.append(f"row {line}: missing {', '.join(missing)}")
+            continue
+
+        try:
+            start_date = datetime.date.fromisoformat(str(row["start_date"]))
+            end_date = datetime.date.fromisoformat(str(row["end_date"]))
+        except ValueError:
+            errors.append(f"row {line}: dates must be YYYY-MM-DD")
+            continue
+        if end_date < start_date:
+            errors.append(f"row {line}: end_date is before start_date")
+            continue
+
+        try:
+            age = int(row.get("age") or 18)
+        except (TypeError, ValueError):
+            errors.append(f"row {line}: age must be a whole number")
+            continue
+        if not 18 <= age <= 100:
+            errors.append(f"row {line}: age must be between 18 and 100")
+            continue
+
+        image_path = row.get("image_path") or None
+        if image_path:
+            image_path = os.path.join(base_dir, image_path)
+            if not os.path.isfile(image_path):
+                errors.append(f"row {line}: image not found: {image_path}")
+                continue
+
+        election_name = row["election_name"]
+        election = elections.get(election_name)
+        if election is None:
+            election = elections[election_name] = {
+                'election_id': election_id_for(election_name),
+                'name': election_name,
+                'description': row.get("election_description") or "",
+                'start_date': str(start_date),
+                'end_date': str(end_date),
+            }
+        elif (election['start_date'], election['end_date']) != (str(start_date), str(end_date)):
+            errors.append(f"row {line}: dates differ from earlier rows for election '{election_name}'")
+            continue
+
+        key = (election_name, row["candidate_name"], row["party"])
+        if key in seen:
+            errors.append(f"row {line}: duplicate candidate '{row['candidate_name']}' in '{election_name}'")
+            continue
+        seen.add(key)
+
+        candidates.append({
+            'candidate_id': candidate_id_for(*key),
+            'election_id': election['election_id'],
+            'name': row["candidate_name"],
+            'party': row["party"],
+            'age': age,
+            'bio': row.get("bio") or "",
+            'image_url': row.get("image_url") or "",
+            'image_path': image_path,
+        })
+
+    if errors:
+        raise ManifestError(errors)
+    return list(elections.values()), candidates
+
+
+# --- Checkpointing ---
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            return set(json.load(f).get("done", []))
+    return set()
+
+
+def save_checkpoint(path, done):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"done": sorted(done)}, f)
+    os.replace(tmp, path)
+
+
+# --- Import ---
+def upload_image(s3, candidate):
+    path = candidate['image_path']
+    ext = os.path.splitext(path)[-1].lower()
+    # Keyed by candidate_id so a resumed import reuses the same object
+    key = f"candidate-images/{candidate['candidate_id']}{ext}"
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        s3.upload_fileobj(f, BUCKET_NAME, key, ExtraArgs={'ContentType': content_type})
+    return f"https://{BUCKET_NAME}.s3.amazonaws.com/{key}"
+
+
+def match_existing_elections(election_table, elections, candidates):
+    """Attach manifest elections to same-named elections already in the table
+    (e.g. created in the admin UI) instead of creating duplicates."""
+    existing = {}
+    scan_kwargs = {"ProjectionExpression": "election_id, #n", "ExpressionAttributeNames": {"#n": "name"}}
+    while True:
+        response = election_table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            existing.setdefault(item['name'], set()).add(item['election_id'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    errors = []
+    remap = {}
+    matched = []
+    for election in elections:
+        ids = existing.get(election['name'], set())
+        if len(ids) > 1:
+            errors.append(f"election '{election['name']}' already exists {len(ids)} times; rename it first")
+        elif ids:
+            (election_id,) = ids
+            remap[election['election_id']] = election_id
+            election = {**election, 'election_id': election_id, 'existing': True}
+        matched.append(election)
+    if errors:
+        raise ManifestError(errors)
+
+    candidates = [
+        {**c, 'election_id': remap.get(c['election_id'], c['election_id'])}
+        for c in candidates
+    ]
+    return matched, candidates
+
+
+def run_import(elections, candidates, checkpoint_path=None, workers=DEFAULT_WORKERS,
+               progress=None, dynamodb=None, s3=None):
+    """Write validated elections/candidates, skipping anything the checkpoint marks done."""
+    dynamodb = dynamodb or boto3.resource('dynamodb', region_name=AWS_REGION)
+    s3 = s3 or boto3.client('s3', region_name=AWS_REGION)
+    election_table = dynamodb.Table('Elections')
+    candidate_table = dynamodb.Table('Candidates')
+
+    done = load_checkpoint(checkpoint_path)
+    now = datetime.datetime.utcnow().isoformat()
+
+    elections, candidates = match_existing_elections(election_table, elections, candidates)
+    pending_elections = [e for e in elections if e['election_id'] not in done and not e.get('existing')]
+    with election_table.batch_writer() as batch:
+        for election in pending_elections:
+            batch.put_item(Item={**election, 'created_at': now})
+    done.update(e['election_id'] for e in pending_elections)
+    save_checkpoint(checkpoint_path, done)
+
+    pending = [c for c in candidates if c['candidate_id'] not in done]
+    total = len(pending)
+
+    # Upload images concurrently and write each candidate as soon as it is
+    # ready, in chunks of CHECKPOINT_EVERY, each through its own batch writer.
+    # A chunk's IDs are checkpointed only after its writer has exited, i.e.
+    # after boto3 has flushed and retried every buffered (including
+    # unprocessed) item.
+    written = 0
+    failed = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(upload_image, s3, c): c for c in pending if c['image_path']}
+        ready = ((c, None) for c in pending if not c['image_path'])
+        uploaded = ((futures[f], f) for f in as_completed(futures))
+        stream = itertools.chain(ready, uploaded)
+
+        try:
+            while failed is None:
+                flushed = []
+                with candidate_table.batch_writer() as batch:
+                    for candidate, future in stream:
+                        item = {k: v for k, v in candidate.items() if k != 'image_path'}
+                        if future is not None:
+                            try:
+                                item['image_url'] = future.result()
+                            except Exception as e:
+                                failed = e
+                                break
+                        item['created_at'] = now
+                        batch.put_item(Item=item)
+                        flushed.append(candidate['candidate_id'])
+                        if len(flushed) >= CHECKPOINT_EVERY:
+                            break
+                if not flushed:
+                    break
+                done.update(flushed)
+                save_checkpoint(checkpoint_path, done)
+                written += len(flushed)
+                if progress:
+                    progress(written, total)
+        except BaseException:
+            # Don't let the executor's exit wait on queued uploads before a
+            # DynamoDB (or any other) error is reported
+            for f in futures:
+                f.cancel()
+            raise
+        if failed is not None:
+            for f in futures:
+                f.cancel()
+
+    if failed is not None:
+        raise failed
+    # A finished import leaves nothing to resume; a stale checkpoint would
+    # otherwise make an edited manifest skip its changed rows.
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return len(pending_elections), total
+
+
+def import_manifest(source, checkpoint_path=None, workers=DEFAULT_WORKERS, base_dir=".", progress=None):
+    elections, candidates = validate_manifest(load_manifest(source), base_dir=base_dir)
+    return run_import(elections, candidates, checkpoint_path, workers, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import elections and candidates from a CSV/JSON manifest.")
+    parser.add_argument("manifest", help="Path to a .csv or .json manifest")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <manifest>.<content hash>.checkpoint.json)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel image uploads")
+    parser.add_argument("--validate-only", action="store_true", help="Validate the manifest and exit")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    try:
+        elections, candidates = validate_manifest(load_manifest(args.manifest), base_dir=base_dir)
+    except (ValueError, OSError) as e:
+        # ManifestError, unsupported format and malformed JSON are all ValueErrors
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    print(f"✅ Manifest OK: {len(elections)} election(s), {len(candidates)} candidate(s)")
+    if args.validate_only:
+        return
+
+    # Keyed on the manifest contents, so an edited manifest never resumes from
+    # the checkpoint of its previous version
+    with open(args.manifest, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    checkpoint = args.checkpoint or f"{args.manifest}.{digest}.checkpoint.json"
+
+    def progress(written, total):
+        if written % 1000 == 0 or written == total:
+            print(f"  {written}/{total} candidates written")
+
+    try:
+        n_elections, n_candidates = run_import(elections, candidates, checkpoint, args.workers, progress)
+    except ManifestError as e:
+        # Raised by match_existing_elections, before anything is written
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    print(f"✅ Imported {n_elections} election(s) and {n_candidates} candidate(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,8 @@ import os
 
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 STREAM_NAME = os.getenv("KINESIS_STREAM_NAME", "Vote_Major_Project")
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "10"))
+VOTES_BY_ELECTION_INDEX = os.getenv("VOTES_BY_ELECTION_INDEX", "election_id-timestamp-index")
+ANALYTICS_LOOKBACK_SECONDS = int(os.getenv("ANALYTICS_LOOKBACK_SECONDS", "60"))
+VOTER_REGISTRY_PATH = os.getenv("VOTER_REGISTRY_PATH")
+VOTED_FILTER_PATH = os.getenv("VOTED_FILTER_PATH")
@@ -0,0 +1,177 @@
+import threading
+from collections import Counter, defaultdict
+
+# Geohash cells for vote maps.
+# Each vote is stored with a precision-6 geohash (~1.2 km x 0.6 km); every
+# coarser cell is just a prefix of it. GeoRollup keeps per-cell,
+# per-candidate_id counts at each precision in ROLLUP_PRECISIONS and is
+# updated one vote at a time, so a map only ever renders the cells for one
+# precision. A viewport is answered by enumerating the geohash cells that
+# cover it and looking each up, so render cost follows the viewport rather
+# than the number of populated cells; each cell's summary is cached until a
+# vote lands in it.
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 6
+ROLLUP_PRECISIONS = (2, 3, 4, 5, 6)
+# Most points a map is asked to draw; beyond this a coarser precision is used
+MAX_MAP_CELLS = 5000
+
+# Map zoom level -> geohash precision whose cells are a few pixels wide
+_ZOOM_PRECISION = [(3, 2), (5, 3), (8, 4), (10, 5)]
+
+
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            ch = (ch << 1) | 1
+            rng[0] = mid
+        else:
+            ch <<= 1
+            rng[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def decode_geohash(cell):
+    """Centre (lat, lon) of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for c in cell:
+        bits = BASE32.index(c)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def vote_geohash(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(float(latitude), float(longitude))
+
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell at `precision`."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def covering_cells(bounds, precision):
+    """Geohash cells at `precision` overlapping (south, west, north, east)."""
+    south, west, north, east = bounds
+    height, width = cell_size(precision)
+    rows = range(int((south + 90) // height), int(min(north + 90, 180 - 1e-9) // height) + 1)
+    cols = range(int((west + 180) // width), int(min(east + 180, 360 - 1e-9) // width) + 1)
+    for row in rows:
+        lat = -90 + (row + 0.5) * height
+        for col in cols:
+            yield encode_geohash(lat, -180 + (col + 0.5) * width, precision)
+
+
+def precision_for_zoom(zoom):
+    for max_zoom, precision in _ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return ROLLUP_PRECISIONS[-1]
+
+
+def viewport_bounds(lat, lon, zoom, width_px=960, height_px=600):
+    """Approximate (south, west, north, east) seen by a web map at `zoom`,
+    using 256 px tiles spanning 360 / 2**zoom degrees of longitude."""
+    lon_span = width_px / 256 * 360 / 2 ** zoom
+    lat_span = height_px / 256 * 180 / 2 ** zoom
+    return (
+        max(-90.0, lat - lat_span / 2), max(-180.0, lon - lon_span / 2),
+        min(90.0, lat + lat_span / 2), min(180.0, lon + lon_span / 2),
+    )
+
+
+class GeoRollup:
+    """Vote counts per geohash cell and candidate_id. Shared by every viewer
+    of an election, so updates and reads go through `lock`."""
+
+    def __init__(self, precisions=ROLLUP_PRECISIONS):
+        self.precisions = precisions
+        self.counts = {p: defaultdict(Counter) for p in precisions}
+        self._summaries = {p: {} for p in precisions}
+        self.lock = threading.RLock()
+
+    def add(self, vote):
+        """Count a VoteRecord; votes without coordinates are skipped."""
+        cell = vote.geohash
+        if not cell:
+            return False
+        with self.lock:
+            for p in self.precisions:
+                prefix = cell[:p]
+                self.counts[p][prefix][vote.candidate_id] += 1
+                self._summaries[p].pop(prefix, None)
+        return True
+
+    def _summary(self, precision, cell):
+        summary = self._summaries[precision].get(cell)
+        if summary is None:
+            by_candidate = self.counts[precision][cell]
+            lat, lon = decode_geohash(cell)
+            leader, leader_votes = by_candidate.most_common(1)[0]
+            total = sum(by_candidate.values())
+            summary = self._summaries[precision][cell] = {
+                "cell": cell,
+                "latitude": lat,
+                "longitude": lon,
+                "votes": total,
+                "leader": leader,
+                "leader_votes": leader_votes,
+                "leader_share": leader_votes / total,
+            }
+        return summary
+
+    def cells(self, precision, bounds=None):
+        """Aggregated cells at `precision`, optionally limited to those
+        overlapping (south, west, north, east). `leader` is a candidate_id."""
+        with self.lock:
+            counts = self.counts[precision]
+            if bounds is None:
+                return [self._summary(precision, cell) for cell in counts]
+            return [self._summary(precision, cell) for cell in covering_cells(bounds, precision) if cell in counts]
+
+    def centre(self):
+        """Vote-weighted centre, from the coarsest cells."""
+        cells = self.cells(self.precisions[0])
+        total = sum(c["votes"] for c in cells)
+        if not total:
+            return None
+        return (
+            sum(c["latitude"] * c["votes"] for c in cells) / total,
+            sum(c["longitude"] * c["votes"] for c in cells) / total,
+        )
+
+    def visible_cells(self, lat, lon, zoom, max_cells=MAX_MAP_CELLS):
+        """Cells inside the viewport at the zoom's precision, stepping to a
+        coarser precision while more than `max_cells` would be drawn.
+        Returns (precision, cells)."""
+        bounds = viewport_bounds(lat, lon, zoom)
+        wanted = precision_for_zoom(zoom)
+        for precision in sorted((p for p in self.precisions if p <= wanted), reverse=True):
+            cells = self.cells(precision, bounds)
+            if len(cells) <= max_cells:
+                return precision, cells
+        # Even the coarsest level is too dense: keep the busiest cells
+        return precision, sorted(cells, key=lambda c: c["votes"], reverse=True)[:max_cells]
@@ -0,0 +1,383 @@
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import boto3
+
+from backend.config import AWS_REGION
+from backend.voter_registry import build_voted_filter, scan_votes
+from backend.votes import VOTE_WRITE_CONDITION, VoteRecord, accepts_vote
+
+# Replay/backfill: rebuild the Votes table from archived votes.
+# Sources are the S3 `votes/` objects written by the Kinesis Lambda, CSV
+# dumps (e.g. votes_data.csv) and the local mock_db JSONL journal. All
+# votes are folded in timestamp order with the same acceptance rule as the
+# live conditional write, so the result matches what the live pipeline would
+# have stored. Sources are streamed; inputs larger than RUN_SIZE are sorted
+# in runs spilled to a temp directory and merged, so memory is bounded by the
+# folded state (one record per voter) rather than the archive. Writes go out
+# in parallel batches, rate limited, and each finished batch is checkpointed
+# so an interrupted run resumes.
+#
+# With --prune, Votes items for voters absent from the archives are deleted
+# so the table is a true rebuild. The already-voted Bloom filter
+# (VOTED_FILTER_PATH) is not updated by table writes; pass --voted-filter to
+# rebuild it from the table afterwards, with voting paused.
+
+BUCKET_NAME = "votesbucketmajorproject"
+S3_PREFIX = "votes/"
+REPLAY_NAMESPACE = uuid.UUID("0b5cf1d2-6a43-4f0e-8d6c-2f7a9e3c1b58")
+BATCH_SIZE = 1000
+DEFAULT_WORKERS = 8
+# Votes sorted in memory at once before spilling a run to disk
+RUN_SIZE = 1_000_000
+REQUIRED_FIELDS = ("voter_id", "election_id", "timestamp")
+
+# The live write condition fold_votes() reproduces via accepts_vote(). If
+# VOTE_WRITE_CONDITION changes, both must be updated before replaying.
+FOLDED_WRITE_CONDITION = "attribute_not_exists(voter_id) OR election_id <> :eid"
+
+
+# --- Sources ---
+def read_s3_votes(bucket=BUCKET_NAME, prefix=S3_PREFIX, workers=32, s3=None):
+    s3 = s3 or boto3.client('s3', region_name=AWS_REGION)
+    keys = [
+        obj['Key']
+        for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix)
+        for obj in page.get('Contents', [])
+    ]
+
+    def fetch(key):
+        return json.loads(s3.get_object(Bucket=bucket, Key=key)['Body'].read())
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(fetch, keys)
+
+
+def read_csv_votes(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            # Older dumps only carry a bare `candidate` column
+            if "candidate_name" not in row and "candidate" in row:
+                row["candidate_name"] = row.pop("candidate")
+            yield row
+
+
+def read_journal_votes(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _utc_isoformat(value):
+    # CSV exports write "2025-04-14 08:00:00.123456"; live votes are naive
+    # UTC "2025-04-14T08:00:00.123456". Parse both (and offsets) to the latter
+    # so timestamps sort and compare as the live ones do.
+    ts = datetime.fromisoformat(str(value))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.isoformat()
+
+
+def normalise(vote, default_election_id=None):
+    """VoteRecord for an archived vote, or None if it can't be stored."""
+    vote = {k: v.strip() if isinstance(v, str) else v for k, v in vote.items()}
+    # CSV has no nulls: empty fields come through as ''
+    vote = {k: v for k, v in vote.items() if v is not None and v != ""}
+    if default_election_id and not vote.get("election_id"):
+        vote["election_id"] = default_election_id
+    if any(field not in vote for field in REQUIRED_FIELDS):
+        return None
+    try:
+        vote["voter_id"] = str(vote["voter_id"])
+        vote["timestamp"] = _utc_isoformat(vote["timestamp"])
+        if not vote.get("vote_id"):
+            # Deterministic so replaying the same archive twice writes the same item
+            seed = f"{vote['voter_id']}:{vote['election_id']}:{vote['timestamp']}"
+            vote["vote_id"] = str(uuid.uuid5(REPLAY_NAMESPACE, seed))
+        return VoteRecord.from_item(vote)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalise_all(votes, stats, default_election_id=None):
+    """Normalise a stream of raw votes, counting read and skipped rows in `stats`."""
+    for raw in votes:
+        stats["read"] += 1
+        vote = normalise(raw, default_election_id)
+        if vote is None:
+            stats["skipped"] += 1
+            continue
+        yield vote
+
+
+# --- Fold ---
+def _order(vote):
+    return vote.timestamp, vote.vote_id
+
+
+def _spill(run, directory, index):
+    run.sort(key=_order)
+    path = os.path.join(directory, f"run-{index:05d}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for vote in run:
+            f.write(json.dumps(vote.to_stream_payload()) + "\n")
+    return path
+
+
+def _read_run(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield VoteRecord.from_item(json.loads(line))
+
+
+def sorted_votes(votes, run_size=RUN_SIZE):
+    """Yield votes in timestamp order, spilling sorted runs to disk once
+    more than `run_size` have been read."""
+    run = []
+    with tempfile.TemporaryDirectory(prefix="replay-") as directory:
+        runs = []
+        for vote in votes:
+            run.append(vote)
+            if len(run) >= run_size:
+                runs.append(_spill(run, directory, len(runs)))
+                run = []
+        if not runs:
+            run.sort(key=_order)
+            yield from run
+            return
+        run.sort(key=_order)
+        yield from heapq.merge(run, *(_read_run(path) for path in runs), key=_order)
+
+
+def check_write_rule():
+    """Refuse to fold if the live write condition no longer matches accepts_vote()."""
+    if VOTE_WRITE_CONDITION != FOLDED_WRITE_CONDITION:
+        raise RuntimeError(
+            f"VOTE_WRITE_CONDITION is now {VOTE_WRITE_CONDITION!r} but replay folds with "
+            f"{FOLDED_WRITE_CONDITION!r}; update accepts_vote() and FOLDED_WRITE_CONDITION."
+        )
+    first = VoteRecord("v1", "voter", election_id="e1")
+    cases = [
+        (None, "e1", True),    # attribute_not_exists(voter_id)
+        (first, "e1", False),  # same election: rejected
+        (first, "e2", True),   # election_id <> :eid
+    ]
+    for existing, election_id, expected in cases:
+        if accepts_vote(existing, VoteRecord("v2", "voter", election_id=election_id)) != expected:
+            raise RuntimeError("accepts_vote() no longer matches VOTE_WRITE_CONDITION")
+
+
+def fold_votes(votes, run_size=RUN_SIZE):
+    """Apply votes in timestamp order and return the final record per voter_id."""
+    check_write_rule()
+    state = {}
+    rejected = 0
+    for vote in sorted_votes(votes, run_size):
+        if accepts_vote(state.get(vote.voter_id), vote):
+            state[vote.voter_id] = vote
+        else:
+            rejected += 1
+    return state, rejected
+
+
+def tally(state):
+    return Counter((v.election_id, v.candidate_name) for v in state.values())
+
+
+# --- Writing ---
+class RateLimiter:
+    """Token bucket shared by all writer threads; rate is items per second."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= min(n, self.rate):
+                    self.tokens -= n
+                    return
+                wait = (min(n, self.rate) - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def state_fingerprint(state, voter_ids, table_name):
+    """Content hash of the folded items, so a checkpoint is only reused for
+    exactly the same replay output (not merely the same set of voters)."""
+    digest = hashlib.sha256(table_name.encode("utf-8"))
+    for voter_id in voter_ids:
+        item = state[voter_id].to_stream_payload()
+        digest.update(json.dumps(item, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_checkpoint(path, fingerprint):
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("fingerprint") == fingerprint:
+            return set(data.get("done", []))
+        print("⚠️ Checkpoint belongs to a different replay input; starting over.")
+    return set()
+
+
+def save_checkpoint(path, fingerprint, done):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"fingerprint": fingerprint, "done": sorted(done)}, f)
+    os.replace(tmp, path)
+
+
+def write_state(state, table_name="Votes", workers=DEFAULT_WORKERS, rate=None,
+                checkpoint_path=None, dynamodb=None):
+    dynamodb = dynamodb or boto3.resource('dynamodb', region_name=AWS_REGION)
+    table = dynamodb.Table(table_name)
+
+    voter_ids = sorted(state)
+    batches = [voter_ids[i:i + BATCH_SIZE] for i in range(0, len(voter_ids), BATCH_SIZE)]
+    fingerprint = state_fingerprint(state, voter_ids, table_name)
+    done = load_checkpoint(checkpoint_path, fingerprint)
+    limiter = RateLimiter(rate)
+    lock = threading.Lock()
+
+    def write_batch(index):
+        ids = batches[index]
+        limiter.acquire(len(ids))
+        with table.batch_writer() as batch:
+            for voter_id in ids:
+                batch.put_item(Item=state[voter_id].to_dynamo_item())
+        with lock:
+            done.add(index)
+            save_checkpoint(checkpoint_path, fingerprint, done)
+        return len(ids)
+
+    pending = [i for i in range(len(batches)) if i not in done]
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for n in pool.map(write_batch, pending):
+            written += n
+    return written, len(batches) - len(pending)
+
+
+def prune_table(state, table_name="Votes", rate=None, dynamodb=None, dry_run=False):
+    """Delete items for voters the replay didn't produce. Returns how many
+    were (or, with dry_run, would be) deleted."""
+    dynamodb = dynamodb or boto3.resource('dynamodb', region_name=AWS_REGION)
+    table = dynamodb.Table(table_name)
+    limiter = RateLimiter(rate)
+
+    stale = [item["voter_id"] for item in scan_votes(table) if item["voter_id"] not in state]
+    if dry_run:
+        return len(stale)
+    for i in range(0, len(stale), BATCH_SIZE):
+        ids = stale[i:i + BATCH_SIZE]
+        limiter.acquire(len(ids))
+        with table.batch_writer() as batch:
+            for voter_id in ids:
+                batch.delete_item(Key={"voter_id": voter_id})
+    return len(stale)
+
+
+def rebuild_voted_filter(path, capacity, table_name="Votes", dynamodb=None):
+    """Rebuild the already-voted Bloom filter from the rewritten table."""
+    dynamodb = dynamodb or boto3.resource('dynamodb', region_name=AWS_REGION)
+    bloom = build_voted_filter(scan_votes(dynamodb.Table(table_name)), capacity)
+    bloom.save(path)
+    return bloom
+
+
+def replay(s3=False, csv_paths=(), journal_paths=(), election_id=None, run_size=RUN_SIZE):
+    """Fold every source into the final Votes state. Returns (state, stats)
+    where stats counts votes read, skipped as unusable and rejected as repeats."""
+    sources = []
+    if s3:
+        sources.append(read_s3_votes())
+    sources.extend(read_csv_votes(p) for p in csv_paths)
+    sources.extend(read_journal_votes(p) for p in journal_paths)
+
+    stats = Counter()
+    votes = normalise_all((v for source in sources for v in source), stats, election_id)
+    state, stats["rejected"] = fold_votes(votes, run_size)
+    return state, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the Votes table from archived votes.")
+    parser.add_argument("--s3", action="store_true", help=f"Read s3://{BUCKET_NAME}/{S3_PREFIX}*.json")
+    parser.add_argument("--csv", action="append", default=[], help="CSV dump (repeatable)")
+    parser.add_argument("--journal", action="append", default=[], help="mock_db JSONL journal (repeatable)")
+    parser.add_argument("--election-id", help="Election ID for rows that don't carry one")
+    parser.add_argument("--table", default="Votes", help="Target DynamoDB table")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rate", type=int, default=0, help="Max items written per second (0 = unlimited)")
+    parser.add_argument("--checkpoint", default="replay.checkpoint.json")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete table items for voters not present in the archives")
+    parser.add_argument("--voted-filter", help="Rebuild the already-voted Bloom filter at this path afterwards")
+    parser.add_argument("--capacity", type=int,
+                        help="Expected total votes for the rebuilt filter (required with --voted-filter)")
+    parser.add_argument("--dry-run", action="store_true", help="Fold and tally only; write nothing")
+    args = parser.parse_args()
+
+    if not (args.s3 or args.csv or args.journal):
+        parser.error("give at least one of --s3, --csv, --journal")
+    if args.voted_filter and not args.capacity:
+        parser.error("--voted-filter needs --capacity")
+
+    t0 = time.perf_counter()
+    state, stats = replay(args.s3, args.csv, args.journal, args.election_id)
+    print(f"📥 Read {stats['read']:,} votes in {time.perf_counter() - t0:.1f}s: "
+          f"{len(state):,} stored, {stats['rejected']:,} rejected as repeat votes, "
+          f"{stats['skipped']:,} skipped (missing voter_id, election_id or timestamp)")
+
+    for (election, candidate), count in sorted(tally(state).items(), key=lambda kv: (str(kv[0][0]), -kv[1])):
+        print(f"  {election} | {candidate}: {count:,}")
+
+    if args.dry_run:
+        if args.prune:
+            stale = prune_table(state, args.table, dry_run=True)
+            print(f"🧹 --prune would delete {stale:,} items from {args.table}")
+        print("🧪 Dry run: nothing written.")
+        return
+
+    t0 = time.perf_counter()
+    written, skipped = write_state(state, args.table, args.workers, args.rate, args.checkpoint)
+    print(f"✅ Wrote {written:,} items to {args.table} in {time.perf_counter() - t0:.1f}s "
+          f"({skipped} batches already done per checkpoint)")
+
+    if args.prune:
+        deleted = prune_table(state, args.table, args.rate)
+        print(f"🧹 Deleted {deleted:,} items not present in the archives")
+
+    if args.voted_filter:
+        bloom = rebuild_voted_filter(args.voted_filter, args.capacity, args.table)
+        print(f"✅ Rebuilt already-voted filter at {args.voted_filter} ({bloom.nbytes / 2**20:.1f} MiB)")
+    else:
+        print("⚠️ The already-voted filter (VOTED_FILTER_PATH) still reflects the old table; "
+              "rebuild it with --voted-filter or `backend.voter_registry build-voted` before voting resumes.")
+
+
+if __name__ == "__main__":
+    main()
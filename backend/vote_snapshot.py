@@ -0,0 +1,79 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+
+from backend.geo import GeoRollup
+from backend.votes import VoteBatch, VoteRecord
+
+# Incremental view of an election's votes.
+# Keeps a high-water mark on the ISO `timestamp` attribute so each refresh
+# only has to pull and merge the votes written since the previous one.
+# Timestamps are set by the voter-panel host, and a vote stamped T can become
+# visible after one stamped T+1 (clock skew, slow writes, index propagation),
+# so every refresh re-reads a lookback window behind the mark and drops
+# repeats by vote_id.
+# Votes are kept as VoteRecords; the VoteBatch used for reports is extended
+# with only the votes merged since it was last built.
+# One snapshot per election is shared by every analytics session, so
+# refreshes and reads of the counters go through `lock`.
+
+
+class VoteSnapshot:
+    def __init__(self, election_id, lookback_seconds=60):
+        self.election_id = election_id
+        self.lookback = timedelta(seconds=lookback_seconds)
+        self.votes = []
+        self._batch = VoteBatch.from_records([])
+        self.candidate_counts = Counter()
+        self.party_counts = Counter()
+        self.geo = GeoRollup()
+        self.high_water_mark = None
+        self._seen_ids = set()
+        self.lock = threading.RLock()
+
+    @property
+    def total_votes(self):
+        return len(self.votes)
+
+    @property
+    def batch(self):
+        """All merged votes as a VoteBatch."""
+        with self.lock:
+            built = len(self._batch)
+            if built < len(self.votes):
+                self._batch = VoteBatch.concat([self._batch, VoteBatch.from_records(self.votes[built:])])
+            return self._batch
+
+    def fetch_from(self):
+        """Lower bound for the next fetch: the high-water mark minus the lookback window."""
+        if self.high_water_mark is None:
+            return None
+        return (datetime.fromisoformat(self.high_water_mark) - self.lookback).isoformat()
+
+    def merge(self, new_votes):
+        """Fold newly fetched votes into the aggregates. Returns how many were added."""
+        with self.lock:
+            added = 0
+            for item in new_votes:
+                vote_id = item.get("vote_id")
+                if vote_id in self._seen_ids:
+                    continue
+                self._seen_ids.add(vote_id)
+
+                vote = VoteRecord.from_item(item)
+                self.votes.append(vote)
+                self.candidate_counts[vote.candidate_name] += 1
+                self.party_counts[vote.party] += 1
+                self.geo.add(vote)
+                added += 1
+
+                ts = vote.timestamp or ""
+                if self.high_water_mark is None or ts > self.high_water_mark:
+                    self.high_water_mark = ts
+            return added
+
+    def refresh(self, fetch_votes_since):
+        """Pull votes from `fetch_from()` on via `fetch_votes_since(election_id, since)`."""
+        # Held across the fetch so concurrent viewers don't query the same window twice
+        with self.lock:
+            return self.merge(fetch_votes_since(self.election_id, self.fetch_from()))
@@ -0,0 +1,259 @@
+import argparse
+import csv
+import fcntl
+import hashlib
+import math
+import os
+import time
+from array import array
+
+import numpy as np
+
+# Voter-registry eligibility index.
+# Voter IDs are hashed to 64 bits and kept as a sorted uint64 array saved in
+# .npy format, so every worker can np.load(..., mmap_mode='r') the same file
+# and share its pages. Lookups are a binary search; at ~8 bytes per voter a
+# 50M roll is ~400 MB on disk and only the touched pages are resident.
+#
+# "Has already voted" is pre-checked with a Bloom filter over
+# (election_id, voter_id). A negative is definite and answered locally;
+# a positive only means "maybe", and the caller confirms against DynamoDB.
+# The filter file is mapped shared and read-write: each recorded vote sets
+# its bits in the file itself (under an flock, since bits share bytes), so
+# every worker mapping the same file sees it and it survives restarts. All
+# voter-panel workers must therefore map the same file; rebuild it with
+# `build-voted` only while voting is paused.
+
+HASH_KEY = os.getenv("VOTER_HASH_KEY", "voter-registry").encode("utf-8")
+BLOOM_HEADER = np.dtype([("m", "<u8"), ("k", "<u8")])
+CHUNK_SIZE = 1_000_000
+MASK64 = (1 << 64) - 1
+
+
+def hash_voter_id(voter_id):
+    digest = hashlib.blake2b(str(voter_id).strip().encode("utf-8"), digest_size=8, key=HASH_KEY).digest()
+    return int.from_bytes(digest, "little")
+
+
+def vote_key(election_id, voter_id):
+    return hash_voter_id(f"{election_id}:{str(voter_id).strip()}")
+
+
+# --- Registry ---
+class VoterRegistry:
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    @classmethod
+    def from_ids(cls, voter_ids):
+        hashes = np.frombuffer(array("Q", map(hash_voter_id, voter_ids)), dtype=np.uint64)
+        return cls(np.unique(hashes))
+
+    @classmethod
+    def from_csv(cls, csv_path, column="voter_id"):
+        # Hash in chunks so the roll never sits in memory as Python strings
+        chunks = []
+        buf = array("Q")
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                voter_id = row.get(column)
+                if voter_id:
+                    buf.append(hash_voter_id(voter_id))
+                if len(buf) >= CHUNK_SIZE:
+                    chunks.append(np.frombuffer(buf, dtype=np.uint64).copy())
+                    buf = array("Q")
+        chunks.append(np.frombuffer(buf, dtype=np.uint64).copy())
+        return cls(np.unique(np.concatenate(chunks)))
+
+    def save(self, path):
+        # Written aside and swapped in: workers may have the old file mapped
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.hashes, dtype=np.uint64))
+        os.replace(tmp, path)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, voter_id):
+        h = np.uint64(hash_voter_id(voter_id))
+        i = np.searchsorted(self.hashes, h)
+        return bool(i < len(self.hashes) and self.hashes[i] == h)
+
+    @property
+    def nbytes(self):
+        return self.hashes.nbytes
+
+
+# --- Bloom filter ---
+class BloomFilter:
+    def __init__(self, m, k, bits=None, path=None):
+        self.m = int(m)
+        self.k = int(k)
+        self.bits = bits if bits is not None else np.zeros((self.m + 7) // 8, dtype=np.uint8)
+        self.path = path
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.01):
+        m = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        k = max(1, round(m / capacity * math.log(2)))
+        return cls(m, k)
+
+    @classmethod
+    def load(cls, path, mode="r+"):
+        # mode="r+" is a shared mapping: add() writes through to the file and
+        # is visible to every other process mapping it.
+        header = np.fromfile(path, dtype=BLOOM_HEADER, count=1)[0]
+        bits = np.memmap(path, dtype=np.uint8, mode=mode, offset=BLOOM_HEADER.itemsize)
+        return cls(header["m"], header["k"], bits, path if mode == "r+" else None)
+
+    def save(self, path):
+        # Never truncate in place: workers mapping the old file r+ would
+        # SIGBUS. They keep the old inode until they reload.
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.array([(self.m, self.k)], dtype=BLOOM_HEADER).tofile(f)
+            np.asarray(self.bits, dtype=np.uint8).tofile(f)
+        os.replace(tmp, path)
+
+    def _positions(self, key):
+        # Kirsch–Mitzenmacher double hashing from a single 64-bit hash; wraps
+        # at 64 bits to match the vectorised uint64 arithmetic in add_many().
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        return [((h1 + i * h2) & MASK64) % self.m for i in range(self.k)]
+
+    def add(self, key):
+        if self.path is None:
+            self._set_bits(key)
+            return
+        # Setting a bit is a read-modify-write of its byte; without the lock
+        # two workers could each drop the other's bit and create a false
+        # negative.
+        with open(self.path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self._set_bits(key)
+                self.bits.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _set_bits(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def add_many(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+        h1 = keys & np.uint64(0xFFFFFFFF)
+        h2 = (keys >> np.uint64(32)) | np.uint64(1)
+        m = np.uint64(self.m)
+        for i in range(self.k):
+            pos = (h1 + np.uint64(i) * h2) % m
+            np.bitwise_or.at(self.bits, (pos >> np.uint64(3)).astype(np.intp),
+                             (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)))
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+
+def build_voted_filter(votes, capacity=None, error_rate=0.01):
+    """Bloom filter over (election_id, voter_id) pairs from Votes items."""
+    keys = np.frombuffer(array("Q", (vote_key(v["election_id"], v["voter_id"]) for v in votes)), dtype=np.uint64)
+    bloom = BloomFilter.for_capacity(max(capacity or 0, len(keys), 1), error_rate)
+    bloom.add_many(keys)
+    return bloom
+
+
+def scan_votes(table):
+    scan_kwargs = {"ProjectionExpression": "voter_id, election_id"}
+    while True:
+        response = table.scan(**scan_kwargs)
+        yield from response.get("Items", [])
+        if "LastEvaluatedKey" not in response:
+            return
+        scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+# --- Benchmark ---
+def benchmark(n=10_000_000, lookups=200_000, error_rate=0.01):
+    ids = [f"VOTER{i:09d}" for i in range(n)]
+
+    t0 = time.perf_counter()
+    registry = VoterRegistry.from_ids(ids)
+    build_s = time.perf_counter() - t0
+
+    present = ids[:lookups]
+    absent = [f"NOBODY{i:09d}" for i in range(lookups)]
+    t0 = time.perf_counter()
+    hits = sum(voter_id in registry for voter_id in present)
+    misses = sum(voter_id in registry for voter_id in absent)
+    lookup_s = time.perf_counter() - t0
+
+    # Filled to its design capacity, so the false-positive rate is the one
+    # a full filter would show in production
+    t0 = time.perf_counter()
+    bloom = build_voted_filter(({"election_id": "e1", "voter_id": v} for v in ids),
+                               capacity=n, error_rate=error_rate)
+    bloom_build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    false_positives = sum(vote_key("e1", v) in bloom for v in absent)
+    bloom_s = time.perf_counter() - t0
+
+    print(f"voters:             {n:,}")
+    print(f"registry build:     {build_s:.2f}s")
+    print(f"registry memory:    {registry.nbytes / 2**20:.1f} MiB ({registry.nbytes / n:.1f} B/voter)")
+    print(f"registry lookup:    {lookup_s / (2 * lookups) * 1e6:.2f} µs "
+          f"(hits {hits}/{lookups}, false hits {misses}/{lookups})")
+    print(f"bloom build:        {bloom_build_s:.2f}s for {n:,} votes (full capacity)")
+    print(f"bloom memory:       {bloom.nbytes / 2**20:.1f} MiB (m={bloom.m:,}, k={bloom.k})")
+    print(f"bloom lookup:       {bloom_s / lookups * 1e6:.2f} µs, "
+          f"false positive rate {false_positives / lookups:.4f} (target {error_rate})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and benchmark the voter-registry index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build the registry index from a voter roll CSV")
+    build.add_argument("csv_path")
+    build.add_argument("out_path", help="Output .npy file")
+    build.add_argument("--column", default="voter_id")
+
+    voted = sub.add_parser("build-voted", help="Build the already-voted Bloom filter from the Votes table")
+    voted.add_argument("out_path")
+    voted.add_argument("--capacity", type=int, required=True,
+                       help="Expected total votes including those still to be cast (sizes the filter)")
+    voted.add_argument("--error-rate", type=float, default=0.01)
+
+    bench = sub.add_parser("bench", help="Measure memory and lookup cost on a synthetic roll")
+    bench.add_argument("-n", type=int, default=10_000_000)
+    bench.add_argument("--lookups", type=int, default=200_000)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        registry = VoterRegistry.from_csv(args.csv_path, args.column)
+        registry.save(args.out_path)
+        print(f"✅ Indexed {len(registry):,} voters into {args.out_path}")
+    elif args.command == "build-voted":
+        import boto3
+        from backend.config import AWS_REGION
+
+        table = boto3.resource("dynamodb", region_name=AWS_REGION).Table("Votes")
+        bloom = build_voted_filter(scan_votes(table), args.capacity, args.error_rate)
+        bloom.save(args.out_path)
+        print(f"✅ Wrote Bloom filter to {args.out_path} ({bloom.nbytes / 2**20:.1f} MiB)")
+    else:
+        benchmark(args.n, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
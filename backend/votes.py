@@ -0,0 +1,276 @@
+import argparse
+import sys
+import time
+from decimal import Decimal
+from operator import attrgetter
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from backend.geo import vote_geohash
+
+# Vote model and processing shared by the live write path
+# (frontend/voter_panel.py), analytics and the replay tool (backend/replay.py),
+# so every module produces and reads identical Votes items.
+
+FIELDS = (
+    "vote_id", "voter_id", "voter_name", "email", "election_id", "candidate_id",
+    "candidate_name", "party", "city", "state", "country", "latitude", "longitude", "timestamp",
+    "geohash",
+)
+# Low-cardinality fields: interned on records, categorical in batches
+CATEGORICAL_FIELDS = (
+    "election_id", "candidate_id", "candidate_name", "party", "city", "state", "country", "geohash",
+)
+
+# The Votes table is keyed on voter_id. A write is accepted unless the voter
+# already has a vote stored for the same election.
+VOTE_WRITE_CONDITION = "attribute_not_exists(voter_id) OR election_id <> :eid"
+
+
+def accepts_vote(existing, vote):
+    """Python twin of VOTE_WRITE_CONDITION for replaying VoteRecords in order."""
+    return existing is None or existing.election_id != vote.election_id
+
+
+def _to_decimal(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def to_dynamo_item(vote):
+    """DynamoDB rejects floats, so coordinates are stored as Decimal."""
+    item = dict(vote)
+    item["latitude"] = _to_decimal(item.get("latitude"))
+    item["longitude"] = _to_decimal(item.get("longitude"))
+    return item
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+# --- Single vote ---
+class VoteRecord:
+    __slots__ = FIELDS
+
+    def __init__(self, vote_id, voter_id, voter_name=None, email=None, election_id=None,
+                 candidate_id=None, candidate_name=None, party=None, city=None, state=None,
+                 country=None, latitude=None, longitude=None, timestamp=None, geohash=None):
+        self.vote_id = vote_id
+        self.voter_id = voter_id
+        self.voter_name = voter_name
+        self.email = email
+        self.election_id = _intern(election_id)
+        self.candidate_id = _intern(candidate_id)
+        self.candidate_name = _intern(candidate_name)
+        self.party = _intern(party)
+        self.city = _intern(city)
+        self.state = _intern(state)
+        self.country = _intern(country)
+        self.latitude = _to_float(latitude)
+        self.longitude = _to_float(longitude)
+        self.timestamp = timestamp
+        # Assigned at write time so map rollups never need the raw coordinates
+        self.geohash = geohash or vote_geohash(self.latitude, self.longitude)
+
+    @classmethod
+    def from_item(cls, item):
+        """From a DynamoDB item, Kinesis/S3 JSON payload or CSV row."""
+        return cls(**{field: item.get(field) for field in FIELDS})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def to_dynamo_item(self):
+        return to_dynamo_item(self.to_dict())
+
+    def to_stream_payload(self):
+        # Coordinates are already floats, so the plain dict is JSON-safe
+        return self.to_dict()
+
+    def __repr__(self):
+        return f"VoteRecord(vote_id={self.vote_id!r}, voter_id={self.voter_id!r}, candidate_name={self.candidate_name!r})"
+
+
+# --- Column-oriented batch ---
+class VoteBatch:
+    """Votes as columns: categoricals for repeated strings, float32 coordinates
+    and int64 timestamps (ns since epoch, NaT as int64 min)."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def _build(cls, column):
+        """Typed columns from `column(field)`, one field at a time so only one
+        untyped column is alive at once."""
+        columns = {}
+        for field in FIELDS:
+            values = column(field)
+            if field in CATEGORICAL_FIELDS:
+                columns[field] = pd.Categorical(values)
+            elif field in ("latitude", "longitude"):
+                try:
+                    # None/Decimal/float cast directly; much faster than
+                    # pd.to_numeric on an object column
+                    columns[field] = np.asarray(values, dtype=np.float32)
+                except (TypeError, ValueError):
+                    columns[field] = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(
+                        dtype=np.float32, na_value=np.nan)
+            elif field == "timestamp":
+                # Votes are stamped with naive UTC (datetime.utcnow()); offsets
+                # from other archives are normalised to UTC and then dropped
+                # so naive and aware values can share one int64 column.
+                parsed = pd.DatetimeIndex(pd.to_datetime(values, errors="coerce", format="ISO8601", utc=True))
+                columns[field] = parsed.tz_localize(None).as_unit("ns").asi8
+            else:
+                columns[field] = np.asarray(values, dtype=object)
+        return cls(columns)
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls._build(lambda field: df[field] if field in df else [None] * len(df))
+
+    @classmethod
+    def from_items(cls, items):
+        """From DynamoDB items or JSON payloads (dicts)."""
+        items = items if isinstance(items, list) else list(items)
+        return cls._build(lambda field: [item.get(field) for item in items])
+
+    @classmethod
+    def from_records(cls, records):
+        records = records if isinstance(records, list) else list(records)
+        return cls._build(lambda field: list(map(attrgetter(field), records)))
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls.from_items([])
+        if len(batches) == 1:
+            return batches[0]
+        columns = {}
+        for field in FIELDS:
+            parts = [b.columns[field] for b in batches]
+            if field in CATEGORICAL_FIELDS:
+                columns[field] = union_categoricals(parts)
+            else:
+                columns[field] = np.concatenate(parts)
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns["vote_id"])
+
+    def to_dataframe(self):
+        # Columns are handed over as-is; the timestamp is viewed, not copied
+        data = dict(self.columns)
+        data["timestamp"] = self.columns["timestamp"].view("datetime64[ns]")
+        return pd.DataFrame(data, copy=False)
+
+    def _column_values(self, field):
+        column = self.columns[field]
+        if field in ("latitude", "longitude"):
+            # str() gives float32's shortest repr, so 12.971599 doesn't come back as 12.97159957...
+            return [None if np.isnan(v) else float(str(v)) for v in column]
+        if field == "timestamp":
+            return [None if t is None else t.isoformat()
+                    for t in column.view("datetime64[ns]").astype("datetime64[us]").tolist()]
+        values = pd.Series(column, dtype=object)
+        return values.where(values.notna(), None).tolist()
+
+    def to_export_frame(self):
+        """Frame for CSV export, readable by the replay tool: ISO timestamps
+        as written by the live path and coordinates at their stored precision."""
+        df = self.to_dataframe()
+        for field in ("latitude", "longitude", "timestamp"):
+            df[field] = self._column_values(field)
+        return df
+
+    def iter_records(self):
+        columns = [self._column_values(field) for field in FIELDS]
+        for row in zip(*columns):
+            yield VoteRecord(*row)
+
+    def to_dynamo_items(self):
+        return [record.to_dynamo_item() for record in self.iter_records()]
+
+    def to_json(self):
+        return [record.to_stream_payload() for record in self.iter_records()]
+
+    @property
+    def nbytes(self):
+        return int(self.to_dataframe().memory_usage(deep=True).sum())
+
+
+# --- Benchmark ---
+def _synthetic_items(n):
+    import random
+    import uuid
+
+    rng = random.Random(0)
+    candidates = [(f"cand-{i}", f"Candidate {i}", f"Party {i % 5}") for i in range(12)]
+    places = [(f"City {i}", f"State {i % 28}", "India") for i in range(500)]
+    items = []
+    for i in range(n):
+        candidate_id, candidate_name, party = rng.choice(candidates)
+        city, state, country = rng.choice(places)
+        items.append({
+            "vote_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "voter_id": f"VOTER{i:09d}",
+            "voter_name": f"Voter {i}",
+            "email": f"voter{i}@example.com",
+            "election_id": "election-1",
+            "candidate_id": candidate_id,
+            "candidate_name": candidate_name,
+            "party": party,
+            "city": city,
+            "state": state,
+            "country": country,
+            "latitude": Decimal(f"{rng.uniform(8, 37):.6f}"),
+            "longitude": Decimal(f"{rng.uniform(68, 97):.6f}"),
+            "timestamp": f"2025-04-14T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}",
+        })
+    return items
+
+
+def benchmark(n=1_000_000):
+    items = _synthetic_items(n)
+
+    t0 = time.perf_counter()
+    df_dicts = pd.DataFrame(items)
+    dict_s = time.perf_counter() - t0
+    dict_bytes = df_dicts.memory_usage(deep=True).sum()
+    del df_dicts
+
+    t0 = time.perf_counter()
+    batch = VoteBatch.from_items(items)
+    df_batch = batch.to_dataframe()
+    batch_s = time.perf_counter() - t0
+    batch_bytes = df_batch.memory_usage(deep=True).sum()
+
+    t0 = time.perf_counter()
+    df_batch["candidate_name"].value_counts()
+    count_s = time.perf_counter() - t0
+
+    print(f"votes:                      {n:,}")
+    print(f"dict -> DataFrame:          {dict_s:.2f}s, {dict_bytes / 2**20:.1f} MiB")
+    print(f"dict -> VoteBatch -> frame: {batch_s:.2f}s, {batch_bytes / 2**20:.1f} MiB "
+          f"({dict_bytes / batch_bytes:.1f}x smaller)")
+    print(f"candidate value_counts:     {count_s * 1000:.1f} ms on the batch frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark VoteBatch against the dict/DataFrame path.")
+    parser.add_argument("-n", type=int, default=1_000_000)
+    benchmark(parser.parse_args().n)
@@ -2,12 +2,17 @@ import streamlit as st
 import boto3
 import uuid
 import datetime
+import hashlib
+import io
 import os
 
+from backend.bulk_import import ManifestError, load_manifest, validate_manifest, run_import
+
 # AWS Services
 dynamodb = boto3.resource('dynamodb', region_name='ap-south-1')
 s3 = boto3.client('s3')
 BUCKET_NAME = "votesbucketmajorproject"
+IMPORT_CHECKPOINT_DIR = ".import_checkpoints"
 
 # DynamoDB Tables
 election_table = dynamodb.Table('Elections')
@@ -45,6 +50,7 @@ def save_election_to_dynamo(name, start_date, end_date, description):
         'created_at': datetime.datetime.utcnow().isoformat()
     }
     election_table.put_item(Item=item)
+    get_all_elections.clear()
     return election_id
 
 # --- Candidate Storage ---
@@ -72,6 +78,7 @@ def save_candidate_to_dynamo(election_id, name, party, age, bio, image_url=None)
     candidate_table.put_item(Item=item)
     return candidate_id
 
+@st.cache_data(ttl=300)
 def get_all_elections():
     response = election_table.scan()
     return response.get('Items', [])
@@ -83,7 +90,7 @@ def show():
 
     st.title("🗳️ Admin Control Panel")
 
-    tab1, tab2, tab3 = st.tabs(["➕ Create Election", "👤 Add Candidate", "⚙️ Settings"])
+    tab1, tab2, tab3, tab4 = st.tabs(["➕ Create Election", "👤 Add Candidate", "📦 Bulk Import", "⚙️ Settings"])
 
     # --- Tab 1: Create Election ---
     with tab1:
@@ -128,8 +135,42 @@ def show():
         else:
             st.warning("⚠️ No elections found. Please create one first.")
 
-    # --- Tab 3: Settings ---
+    # --- Tab 3: Bulk Import ---
     with tab3:
+        st.subheader("📦 Bulk Import Elections & Candidates")
+        st.caption(
+            "CSV or JSON rows with: election_name, election_description, start_date, end_date, "
+            "candidate_name, party, age, bio, image_url. Re-uploading the same manifest resumes an "
+            "interrupted import."
+        )
+        manifest_file = st.file_uploader("Manifest", type=["csv", "json"])
+
+        if manifest_file is not None:
+            raw = manifest_file.getvalue()
+            try:
+                fmt = os.path.splitext(manifest_file.name)[-1].lstrip(".").lower()
+                elections, candidates = validate_manifest(load_manifest(io.BytesIO(raw), fmt=fmt))
+            except (ManifestError, ValueError) as e:
+                st.error(f"⚠️ {e}")
+            else:
+                st.info(f"Manifest OK: {len(elections)} election(s), {len(candidates)} candidate(s).")
+                if st.button("Import"):
+                    os.makedirs(IMPORT_CHECKPOINT_DIR, exist_ok=True)
+                    checkpoint = os.path.join(IMPORT_CHECKPOINT_DIR, f"{hashlib.sha1(raw).hexdigest()}.json")
+                    bar = st.progress(0.0)
+                    try:
+                        n_elections, n_candidates = run_import(
+                            elections, candidates, checkpoint,
+                            progress=lambda written, total: bar.progress(written / total)
+                        )
+                        st.success(f"✅ Imported {n_elections} election(s) and {n_candidates} candidate(s).")
+                    except Exception as e:
+                        st.error(f"Import stopped: {e}. Run it again to resume.")
+                    finally:
+                        get_all_elections.clear()
+
+    # --- Tab 4: Settings ---
+    with tab4:
         st.subheader("⚙️ System Settings / Logs")
         st.info("This section can include admin logs or future settings.")
 
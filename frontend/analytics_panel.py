@@ -14,6 +14,10 @@ import streamlit.components.v1 as components
 import urllib.request
 import os
 
+from backend.config import ANALYTICS_REFRESH_SECONDS, ANALYTICS_LOOKBACK_SECONDS, VOTES_BY_ELECTION_INDEX
+from backend.vote_snapshot import VoteSnapshot
+from backend.votes import VoteBatch
+
 
 # AWS Clients
 dynamodb = boto3.resource('dynamodb', region_name='ap-south-1')
@@ -38,10 +42,12 @@ def geocode_location(city, state, country):
     return None, None
 
 # Functions
+@st.cache_data(ttl=300)
 def get_all_elections():
     response = elections_table.scan()
     return response.get('Items', [])
 
+@st.cache_data(ttl=300)
 def get_candidates_by_election(election_id):
     response = candidates_table.scan(
         FilterExpression="election_id = :eid",
@@ -49,12 +55,39 @@ def get_candidates_by_election(election_id):
     )
     return response.get('Items', [])
 
-def get_votes_from_dynamodb(selected_election_id):
-    response = votes_table.scan(
-        FilterExpression="election_id = :eid",
-        ExpressionAttributeValues={":eid": selected_election_id}
-    )
-    return response.get('Items', [])
+def get_votes_since(election_id, since=None):
+    # Query the (election_id, timestamp) GSI so a refresh only reads votes at
+    # or after `since`, never the whole table. GSIs can't be read with
+    # ConsistentRead; VoteSnapshot's lookback window absorbs the propagation
+    # lag. `timestamp` is a DynamoDB reserved word, hence the placeholder.
+    query_kwargs = {
+        "IndexName": VOTES_BY_ELECTION_INDEX,
+        "KeyConditionExpression": "election_id = :eid",
+        "ExpressionAttributeValues": {":eid": election_id},
+    }
+    if since:
+        query_kwargs["KeyConditionExpression"] += " AND #ts >= :since"
+        query_kwargs["ExpressionAttributeNames"] = {"#ts": "timestamp"}
+        query_kwargs["ExpressionAttributeValues"][":since"] = since
+
+    items = []
+    while True:
+        response = votes_table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+@st.cache_resource
+def get_shared_snapshot(election_id):
+    # One per election across all sessions, so a viewer's rerun only folds
+    # the votes written since anyone last refreshed
+    return VoteSnapshot(election_id, ANALYTICS_LOOKBACK_SECONDS)
+
+def get_vote_snapshot(election_id):
+    snapshot = get_shared_snapshot(election_id)
+    snapshot.refresh(get_votes_since)
+    return snapshot
 
 def get_votes_from_kinesis(stream_name='Vote_Major_Project', limit=100):
     shard_id = kinesis_client.describe_stream(StreamName=stream_name)['StreamDescription']['Shards'][0]['ShardId']
@@ -140,7 +173,7 @@ def generate_pdf(election_info, candidates, df):
     return bytes(pdf.output(dest='S').encode('latin-1'))
 
 
-def display_overview(votes, election_info, candidates):
+def display_overview(votes, election_info, candidates, snapshot=None):
     st.header("📋 Overview Dashboard")
     if election_info:
         st.subheader("Election Details")
@@ -152,8 +185,13 @@ def display_overview(votes, election_info, candidates):
     for idx, candidate in enumerate(candidates, 1):
         st.write(f"{idx}. {candidate['name']} - {candidate.get('party', 'Independent')}")
 
-    total_votes = len(votes)
+    total_votes = snapshot.total_votes if snapshot else len(votes)
     st.metric(label="Total Votes Casted", value=total_votes)
+
+    if snapshot and snapshot.candidate_counts:
+        with snapshot.lock:
+            counts = pd.DataFrame(snapshot.candidate_counts.most_common(), columns=["Candidate", "Votes"])
+        st.bar_chart(counts, x="Candidate", y="Votes")
     
 def display_detailed_analysis():
     st.header("📊 Detailed Analysis")
@@ -189,10 +227,55 @@ def display_detailed_analysis():
     except Exception as e:
         st.error(f"Failed to load dashboard: {str(e)}")
 
-def display_download_reports(votes, election_info, candidates):
+def display_vote_map(snapshot, candidates):
+    st.header("🗺️ Vote Map")
+    if snapshot is None or not snapshot.geo.counts[snapshot.geo.precisions[0]]:
+        st.info("No geolocated votes available for this election yet.")
+        return
+
+    # Cells are led by candidate_id; party disambiguates candidates sharing a name
+    names = {c['candidate_id']: f"{c['name']} ({c.get('party', 'Independent')})" for c in candidates}
+
+    def leader_name(cell):
+        return names.get(cell["leader"], cell["leader"])
+
+    # Focus regions are the busiest precision-3 cells (~156 km across)
+    regions = sorted(snapshot.geo.cells(3), key=lambda c: c["votes"], reverse=True)[:25]
+    focus_options = {"Whole election": None}
+    focus_options.update({f"{r['cell']} · {leader_name(r)} leads ({r['votes']} votes)": r for r in regions})
+    focus = focus_options[st.selectbox("Focus on", list(focus_options.keys()))]
+    zoom = st.slider("Map detail (zoom)", min_value=1, max_value=12, value=7 if focus else 4)
+
+    lat, lon = (focus["latitude"], focus["longitude"]) if focus else snapshot.geo.centre()
+    # Only the cells inside the viewport, capped, are drawn: one row per cell, not per vote
+    precision, visible = snapshot.geo.visible_cells(lat, lon, zoom)
+    if not visible:
+        st.info("No votes in this part of the map.")
+        return
+    cells = pd.DataFrame(visible)
+    cells["leader"] = [leader_name(c) for c in visible]
+    st.caption(f"{len(cells)} regions at geohash precision {precision}")
+
+    view = st.radio("Map", options=["Turnout Heatmap", "Leading Candidate"], horizontal=True)
+    center = {"lat": lat, "lon": lon}
+    if view == "Turnout Heatmap":
+        fig = px.density_mapbox(
+            cells, lat="latitude", lon="longitude", z="votes", radius=25,
+            hover_name="cell", center=center, zoom=zoom, mapbox_style="open-street-map"
+        )
+    else:
+        fig = px.scatter_mapbox(
+            cells, lat="latitude", lon="longitude", color="leader", size="votes",
+            hover_name="cell", hover_data=["votes", "leader_votes", "leader_share"],
+            center=center, zoom=zoom, mapbox_style="open-street-map"
+        )
+    fig.update_layout(margin={"l": 0, "r": 0, "t": 0, "b": 0}, height=600)
+    st.plotly_chart(fig, use_container_width=True)
+
+def display_download_reports(batch, election_info, candidates):
     st.header("📥 Download Reports")
-    if votes:
-        df = pd.DataFrame(votes)
+    if len(batch):
+        df = batch.to_dataframe()
         pdf_buffer = generate_pdf(election_info, candidates, df)
         st.download_button(
             label="Download Election Report (PDF)",
@@ -200,7 +283,7 @@ def display_download_reports(votes, election_info, candidates):
             file_name="election_report.pdf",
             mime="application/pdf"
         )
-        csv_data = df.to_csv(index=False)
+        csv_data = batch.to_export_frame().to_csv(index=False)
         csv_buffer = BytesIO(csv_data.encode('utf-8'))
         st.download_button(
             label="Download Votes Data (CSV)",
@@ -230,14 +313,22 @@ def show():
 
                 #, "Live Votes (Kinesis)"
 
+    live_refresh = st.toggle("🔴 Live refresh", value=False)
+    refresh_seconds = st.number_input(
+        "Refresh interval (seconds)", min_value=2, max_value=600,
+        value=ANALYTICS_REFRESH_SECONDS, disabled=not live_refresh
+    )
+
+    snapshot = None
     if data_source == "All Votes (DynamoDB)":
-        votes = get_votes_from_dynamodb(selected_election_id)
+        snapshot = get_vote_snapshot(selected_election_id)
+        votes = snapshot.votes
     else:
         votes = get_votes_from_kinesis()
 
     tabs = st.radio(
         "🚀 Navigate",
-        options=["Overview", "Detailed Analysis", "Download Reports"],
+        options=["Overview", "Detailed Analysis", "Vote Map", "Download Reports"],
         horizontal=True,
         index=0,
     )
@@ -245,11 +336,18 @@ def show():
     st.markdown("---")
 
     if tabs == "Overview":
-        display_overview(votes, selected_election_info, candidates)
+        display_overview(votes, selected_election_info, candidates, snapshot)
     elif tabs == "Detailed Analysis":
         display_detailed_analysis()
+    elif tabs == "Vote Map":
+        display_vote_map(snapshot, candidates)
     elif tabs == "Download Reports":
-        display_download_reports(votes, selected_election_info, candidates)
+        batch = snapshot.batch if snapshot else VoteBatch.from_items(votes)
+        display_download_reports(batch, selected_election_info, candidates)
+
+    if live_refresh:
+        time.sleep(refresh_seconds)
+        st.rerun()
 
 if __name__ == "__main__":
     show()
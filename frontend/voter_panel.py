@@ -7,7 +7,10 @@ import random
 import logging
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
-from decimal import Decimal
+
+from backend.config import VOTER_REGISTRY_PATH, VOTED_FILTER_PATH
+from backend.voter_registry import VoterRegistry, BloomFilter, vote_key
+from backend.votes import VOTE_WRITE_CONDITION, VoteRecord
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +37,33 @@ def geocode_location(city, state, country):
         pass
     return None, None
 
+# Eligibility index, memory-mapped once per process and shared by sessions
+@st.cache_resource
+def load_voter_registry():
+    if not VOTER_REGISTRY_PATH:
+        return None
+    # Configured but unreadable must fail closed; the error propagates and
+    # the panel refuses to take votes.
+    logger.info(f"Loading voter registry from {VOTER_REGISTRY_PATH}")
+    return VoterRegistry.load(VOTER_REGISTRY_PATH)
+
+@st.cache_resource
+def load_voted_filter():
+    if not VOTED_FILTER_PATH:
+        return None
+    try:
+        logger.info(f"Loading already-voted filter from {VOTED_FILTER_PATH}")
+        return BloomFilter.load(VOTED_FILTER_PATH)
+    except OSError:
+        # Safe to skip: every has_already_voted check then goes to DynamoDB
+        logger.exception("Already-voted filter unavailable; checking DynamoDB for every voter")
+        return None
+
+def is_registered_voter(voter_id):
+    registry = load_voter_registry()
+    # No roll configured: fall back to the old behaviour of accepting any ID
+    return registry is None or voter_id in registry
+
 def get_available_elections():
     return election_table.scan().get("Items", [])
 
@@ -41,6 +71,9 @@ def get_candidates_by_election(election_id):
     return [c for c in candidate_table.scan().get("Items", []) if c["election_id"] == election_id]
 
 def has_already_voted(voter_id, election_id):
+    voted = load_voted_filter()
+    if voted is not None and vote_key(election_id, voter_id) not in voted:
+        return False  # Definite negative, no DynamoDB round-trip
     response = vote_table.get_item(Key={'voter_id': voter_id})
     return response.get('Item') and response["Item"].get("election_id") == election_id
 
@@ -78,34 +111,41 @@ def send_receipt_email(email, vote_data):
 def record_vote(voter_id, voter_name, email, election_id, candidate_id, candidate_name, party, city, state, country):
     lat, lon = geocode_location(city, state, country)
     vote_id = str(uuid.uuid4())
-    vote_data = {
-        "vote_id": vote_id,
-        "voter_id": voter_id,
-        "voter_name": voter_name,
-        "email": email,
-        "election_id": election_id,
-        "candidate_id": candidate_id,
-        "candidate_name": candidate_name,
-        "party": party,
-        "city": city,
-        "state": state,
-        "country": country,
-        "latitude": Decimal(str(lat)) if lat else None,
-        "longitude": Decimal(str(lon)) if lon else None,
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    vote = VoteRecord(
+        vote_id=vote_id,
+        voter_id=voter_id,
+        voter_name=voter_name,
+        email=email,
+        election_id=election_id,
+        candidate_id=candidate_id,
+        candidate_name=candidate_name,
+        party=party,
+        city=city,
+        state=state,
+        country=country,
+        latitude=lat,
+        longitude=lon,
+        timestamp=datetime.utcnow().isoformat()
+    )
+    vote_data = vote.to_dynamo_item()
 
-    vote_table.put_item(Item=vote_data)
+    # The conditional write is the authority; the Bloom pre-check may be stale
+    try:
+        vote_table.put_item(
+            Item=vote_data,
+            ConditionExpression=VOTE_WRITE_CONDITION,
+            ExpressionAttributeValues={":eid": election_id}
+        )
+    except vote_table.meta.client.exceptions.ConditionalCheckFailedException:
+        raise ValueError("This voter has already voted in this election.")
 
-    kinesis_data = vote_data.copy()
-    if isinstance(kinesis_data["latitude"], Decimal):
-        kinesis_data["latitude"] = float(kinesis_data["latitude"])
-    if isinstance(kinesis_data["longitude"], Decimal):
-        kinesis_data["longitude"] = float(kinesis_data["longitude"])
+    voted = load_voted_filter()
+    if voted is not None:
+        voted.add(vote_key(election_id, voter_id))
 
     kinesis.put_record(
         StreamName="election-votes-stream",
-        Data=json.dumps(kinesis_data),
+        Data=json.dumps(vote.to_stream_payload()),
         PartitionKey="vote"
     )
     logger.info(f"Vote recorded: {vote_id}")
@@ -127,6 +167,16 @@ def show():
         st.warning("Please complete all voter and location fields.")
         return
 
+    try:
+        registered = is_registered_voter(voter_id)
+    except Exception:
+        logger.exception("Voter registry could not be loaded")
+        st.error("❌ The electoral roll is unavailable, so voting is disabled. Please try later.")
+        return
+    if not registered:
+        st.error("❌ This Voter ID is not on the electoral roll.")
+        return
+
     if "otp_sent_count" not in st.session_state:
         st.session_state.otp_sent_count = 0
     if "otp_verified" not in st.session_state: